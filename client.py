@@ -5,7 +5,7 @@ Uses ctypes for default Windows MessageBox popups.
 Adds itself to Windows startup (HKCU Run key) to run via pythonw.exe silently.
 """
 
-import os, sys, time, uuid, socket, platform, subprocess, argparse, winreg, ctypes
+import os, sys, time, uuid, socket, platform, subprocess, argparse, threading, winreg, ctypes
 
 # -------- Dependency Check --------
 def ensure_deps():
@@ -17,32 +17,56 @@ def ensure_deps():
 ensure_deps()
 
 import requests  # type: ignore
+from requests.adapters import HTTPAdapter, Retry  # type: ignore
 import webbrowser
 
 POLL_SECONDS = 5
 
+# -------- Shared HTTP session --------
+# One pooled session keeps the TCP (and TLS) connection alive between
+# polls instead of re-handshaking on every request.
+SESSION = requests.Session()
+SESSION.headers["User-Agent"] = "BroadcastClient/1.0"
+_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4,
+                       max_retries=Retry(total=3, backoff_factor=0.5))
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# -------- Cached host facts --------
+# none of these change while the client runs; platform.platform() in
+# particular can spawn subprocesses, so resolve everything once
+_HOST = socket.gethostname()
+_PLAT = platform.platform()
+try:
+    _CID = f"{_HOST}-{uuid.getnode()}"
+except Exception:
+    _CID = _HOST
+
 # -------- Machine ID --------
 def machine_id() -> str:
-    try:
-        return f"{socket.gethostname()}-{uuid.getnode()}"
-    except Exception:
-        return socket.gethostname()
+    return _CID
 
 # -------- Register at Server --------
 def register(server: str, cid: str):
     try:
-        requests.post(f"{server}/register", json={
-            "client_id": cid, "hostname": socket.gethostname(), "platform": platform.platform()
+        SESSION.post(f"{server}/register", json={
+            "client_id": cid, "hostname": _HOST, "platform": _PLAT
         }, timeout=10)
     except Exception as e:
         print("Register error:", e)
 
 # -------- ACK --------
-def ack(server: str, cid: str, mid: int):
+# ids whose popup was dismissed but whose ack POST failed; retried from
+# the poll loop when the server re-offers them
+_UNACKED = set()
+
+def ack(server: str, cid: str, mid: int) -> bool:
     try:
-        requests.post(f"{server}/ack", json={"client_id": cid, "message_id": mid}, timeout=10)
+        r = SESSION.post(f"{server}/ack", json={"client_id": cid, "message_id": mid}, timeout=10)
+        return r.ok
     except Exception as e:
         print("Ack error:", e)
+        return False
 
 # -------- Default Windows Popup --------
 def show_notification(message: str, url: str, mid: int, server: str, cid: str):
@@ -56,16 +80,30 @@ def show_notification(message: str, url: str, mid: int, server: str, cid: str):
     if url:
         webbrowser.open(url)
 
-    # Always send ack
-    ack(server, cid, mid)
+    # Always send ack; on failure remember the id so the poll loop can
+    # retry when the server re-offers it
+    if not ack(server, cid, mid):
+        _UNACKED.add(mid)
 
 # -------- Startup Registry --------
 def add_to_startup():
     exe = sys.executable.replace("python.exe", "pythonw.exe")
     script = os.path.abspath(__file__)
     run_key = r"Software\\Microsoft\\Windows\\CurrentVersion\\Run"
+    cmdline = f'"{exe}" "{script}" --run-silent'
+
+    # Read first: the value is almost always already correct, and
+    # skipping the write avoids registry hive churn on every launch.
+    try:
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, run_key, 0, winreg.KEY_READ) as key:
+            current, _ = winreg.QueryValueEx(key, "BroadcastClient")
+            if current == cmdline:
+                return
+    except OSError:
+        pass  # value (or key) missing — fall through and set it
+
     with winreg.OpenKey(winreg.HKEY_CURRENT_USER, run_key, 0, winreg.KEY_SET_VALUE) as key:
-        winreg.SetValueEx(key, "BroadcastClient", 0, winreg.REG_SZ, f'"{exe}" "{script}" --run-silent')
+        winreg.SetValueEx(key, "BroadcastClient", 0, winreg.REG_SZ, cmdline)
 
 # -------- Loop --------
 def loop(server: str):
@@ -74,17 +112,47 @@ def loop(server: str):
         print("Client ID:", cid, "| Server:", server)
     register(server, cid)
     add_to_startup()  # ensure registry entry exists
+    shown = set()  # message ids already dispatched this session
     while True:
         try:
-            r = requests.post(f"{server}/poll", json={"client_id": cid}, timeout=15)
-            if r.ok:
+            # long-poll: server holds the request open (~25 s) until a
+            # message arrives, so reconnect immediately on response
+            t0 = time.monotonic()
+            r = SESSION.post(f"{server}/poll", json={"client_id": cid}, timeout=35)
+            if not r.ok:
+                # 4xx/5xx (proxy errors included) come back instantly —
+                # pace the retry instead of hammering
+                time.sleep(POLL_SECONDS)
+            else:
                 data = r.json() or {}
-                if data.get("id"):
-                    show_notification(data.get("msg",""), data.get("url",""), data["id"], server, cid)
+                mid = data.get("id")
+                if not mid:
+                    if time.monotonic() - t0 < 1.0:
+                        # fast empty answer (blocked client, long-poll
+                        # disabled): keep the old 5 s cadence; a full
+                        # long-poll window reconnects immediately
+                        time.sleep(POLL_SECONDS)
+                elif mid in shown:
+                    # popup already dispatched: if its ack failed,
+                    # retry it now that the server re-offered the id;
+                    # either way don't spin on /poll
+                    if mid in _UNACKED and ack(server, cid, mid):
+                        _UNACKED.discard(mid)
+                    time.sleep(POLL_SECONDS)
+                else:
+                    # show the popup on a worker thread: MessageBoxW
+                    # is modal and would otherwise stall polling
+                    # until the user clicks
+                    shown.add(mid)
+                    threading.Thread(
+                        target=show_notification,
+                        args=(data.get("msg",""), data.get("url",""), mid, server, cid),
+                        daemon=True,
+                    ).start()
         except Exception as e:
             if "--run-silent" not in sys.argv:
                 print("Poll error:", e)
-        time.sleep(POLL_SECONDS)
+            time.sleep(POLL_SECONDS)  # back off before retrying after errors
 
 # -------- Main --------
 def main():
@@ -2,12 +2,19 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import annotations
-import os, json, sqlite3, typing as _t
+import hashlib, hmac, os, json, queue, sqlite3, threading, time
+from collections import OrderedDict
 from datetime import datetime
 from flask import (
-    Flask, request, jsonify, render_template_string,
-    redirect, url_for, flash
+    Flask, request, jsonify, render_template,
+    redirect, url_for, flash, session
 )
+from jinja2 import ChoiceLoader, DictLoader
+
+try:
+    import orjson  # type: ignore
+except ImportError:          # optional: stdlib json still works, just slower
+    orjson = None
 
 # ----------------------------------------------------------------------
 #  Configuration
@@ -17,8 +24,63 @@ BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
 DB_PATH       = os.environ.get("BMSG_DB", os.path.join(BASE_DIR, "bmsg.db"))
 ADMIN_SECRET  = os.environ.get("BMSG_ADMIN_SECRET", "change-this-secret")
 
+def _auth(secret) -> bool:
+    # constant-time comparison; plain != leaks a timing side channel
+    return hmac.compare_digest((secret or "").encode(), ADMIN_SECRET.encode())
+
+# how long /poll blocks waiting for a message before returning {} so the
+# client reconnects; 0 disables long-polling (useful for tests)
+LONG_POLL_SECONDS = float(os.environ.get("BMSG_LONG_POLL", "25"))
+
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET", "dev-secret")
+# no legitimate request body comes close to this; reject oversized
+# payloads before JSON parsing (or SQLite) ever sees them
+app.config["MAX_CONTENT_LENGTH"] = 64 * 1024
+
+@app.template_filter("isodate")
+def _isodate(ts):
+    """Format an integer epoch for display; tolerate legacy text values."""
+    if ts is None:
+        return ""
+    try:
+        return datetime.utcfromtimestamp(int(ts)).isoformat()
+    except (TypeError, ValueError):
+        return str(ts)
+
+# ----------------------------------------------------------------------
+#  JSON helpers (orjson-backed when available) for the hot client API
+# ----------------------------------------------------------------------
+
+def _json_body() -> dict:
+    raw = request.get_data()
+    if not raw:
+        return {}
+    try:
+        data = orjson.loads(raw) if orjson else json.loads(raw)
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def _json(obj, code: int = 200):
+    body = orjson.dumps(obj) if orjson else json.dumps(obj)
+    return app.response_class(body, status=code, mimetype="application/json")
+
+# route everything else that serializes through Flask — jsonify in the
+# admin APIs, the Jinja tojson filter — through orjson as well
+if orjson is not None:
+    from flask.json.provider import DefaultJSONProvider
+
+    class _OrjsonProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            option = orjson.OPT_INDENT_2 if kwargs.get("indent") else 0
+            return orjson.dumps(obj, default=self.default,
+                                option=option).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = _OrjsonProvider(app)
 
 # ----------------------------------------------------------------------
 #  Schema (+ live “migrations” for existing DBs)
@@ -31,12 +93,15 @@ CREATE TABLE IF NOT EXISTS clients(
   platform  TEXT,
   alias     TEXT,
   blocked   INTEGER NOT NULL DEFAULT 0,
-  last_seen TEXT,
-  created_at TEXT
+  last_seen INTEGER,
+  created_at INTEGER,
+  -- consumer offset: highest message id this client has acked; /poll
+  -- seeks past it instead of re-filtering the whole history
+  last_delivered_id INTEGER NOT NULL DEFAULT 0
 );
 CREATE TABLE IF NOT EXISTS messages(
   id INTEGER PRIMARY KEY AUTOINCREMENT,
-  created_at TEXT,
+  created_at INTEGER,
   msg TEXT NOT NULL,
   url TEXT,
   broadcast INTEGER NOT NULL DEFAULT 0,
@@ -45,29 +110,283 @@ CREATE TABLE IF NOT EXISTS messages(
 CREATE TABLE IF NOT EXISTS reads(
   client_id TEXT,
   message_id INTEGER,
-  read_at TEXT,
+  read_at INTEGER,
   PRIMARY KEY (client_id, message_id)
 );
+CREATE TABLE IF NOT EXISTS message_targets(
+  message_id INTEGER,
+  client_id TEXT,
+  PRIMARY KEY (client_id, message_id)
+);
+-- reverse of the reads PK: lets the planner resolve /poll's NOT EXISTS
+-- (joined by message_id) and the delete cascades without a scan
+CREATE INDEX IF NOT EXISTS idx_reads_msg_client ON reads(message_id, client_id);
+-- serves ORDER BY last_seen DESC on / and /clients without a sort pass
+CREATE INDEX IF NOT EXISTS idx_clients_last_seen ON clients(last_seen DESC);
+-- lets the planner split /poll's broadcast-or-targeted OR into two
+-- indexed probes instead of walking the whole messages table
+CREATE INDEX IF NOT EXISTS idx_msg_broadcast_id ON messages(broadcast, id);
 """
 
+# Hot-path SQL lives in module constants: sqlite3 keeps a per-connection
+# LRU of prepared statements keyed on the SQL text, so reusing the exact
+# same strings skips the prepare step on every /poll, /ack and /register.
+SQL_POLL_CLIENT = ("SELECT blocked, last_delivered_id FROM clients "
+                   "WHERE client_id=?")
+SQL_NEXT_UNREAD = (
+    "SELECT m.id, m.msg, m.url FROM messages m "
+    "WHERE m.id>? "
+    "  AND (m.broadcast=1 OR EXISTS("
+    "         SELECT 1 FROM message_targets t "
+    "         WHERE t.client_id=? AND t.message_id=m.id)) "
+    "  AND NOT EXISTS(SELECT 1 FROM reads r "
+    "                 WHERE r.client_id=? AND r.message_id=m.id) "
+    "ORDER BY m.id ASC LIMIT 1"
+)
+SQL_ACK_INSERT = ("INSERT OR IGNORE INTO reads(client_id,message_id,read_at) "
+                  "VALUES(?,?,?)")
+SQL_ACK_CURSOR = ("UPDATE clients SET last_delivered_id=MAX(last_delivered_id,?) "
+                  "WHERE client_id=?")
+SQL_TOUCH = "UPDATE clients SET last_seen=? WHERE client_id=?"
+SQL_REGISTER = (
+    "INSERT INTO clients(client_id,hostname,platform,alias,blocked,last_seen,created_at)"
+    " VALUES(?,?,?,?,?, ?,?) "
+    "ON CONFLICT(client_id) DO UPDATE SET "
+    "  hostname=excluded.hostname, "
+    "  platform=excluded.platform, "
+    "  last_seen=excluded.last_seen, "
+    "  alias   =COALESCE(excluded.alias, alias)"
+)
+
+# WAL only makes sense for a real file; :memory: databases have no journal.
+_DB_ON_DISK = DB_PATH != ":memory:"
+
 def db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, timeout=5, check_same_thread=False)
+    # cached_statements: default is 128; the bump keeps every recurring
+    # statement (routes + admin ops) resident in the prepare cache
+    conn = sqlite3.connect(DB_PATH, timeout=5, check_same_thread=False,
+                           cached_statements=256)
     conn.row_factory = sqlite3.Row
+    # per-connection pragmas: retry on lock contention instead of
+    # erroring, and give each handle a ~20 MB page cache
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA cache_size=-20000")
     return conn
 
+# One connection per thread: opening (and tearing down) a fresh SQLite
+# handle per request costs more than the one or two statements most
+# handlers run.  Connections are cheap to keep alive under WAL.
+_local = threading.local()
+
+def get_db() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = db()
+    return conn
+
+# long-poll wakeup: /poll waits on this, /admin/send notifies after insert
+_WAKE = threading.Condition()
+
+# in-memory short-circuit for idle polls: if a client has already acked
+# the newest message id there cannot be an unread row for it (delivery
+# and acks proceed in ascending id order), so /poll can answer {} without
+# touching SQLite at all.  _MAX_MSG_ID is seeded from the DB at startup,
+# bumped by /admin/send and reset by clear_messages; _CLIENT_SEEN holds
+# the highest id each client has acked this process lifetime (missing
+# entries just fall through to the SQL path, which stays authoritative).
+# LRU-bounded so an unbounded churn of client ids cannot grow the dict;
+# evicted clients simply lose the fast path, never correctness.
+_MAX_MSG_ID = 0
+_CLIENT_SEEN: OrderedDict = OrderedDict()
+_CLIENT_SEEN_MAX = 10_000
+_SEEN_LOCK = threading.Lock()
+# blocked clients must keep getting the {"blocked": true} answer, so they
+# bypass the fast path; mirrored from the DB by the block/remove admin ops
+_BLOCKED: set = set()
+
+# monotonic stamp of "anything the console shows changed"; every write
+# path bumps it, so home() can validate its cache without querying
+_DB_VERSION = 0
+_VERSION_LOCK = threading.Lock()
+
+def _bump_version() -> None:
+    global _DB_VERSION
+    with _VERSION_LOCK:
+        _DB_VERSION += 1
+
+# Timestamps are stored as integer unix epochs: cheaper to produce than
+# an ISO string, narrower in the B-tree, integer-compared on ORDER BY.
+# They are formatted back to ISO only for display (see the isodate
+# template filter).
+def now_ts() -> int:
+    return int(time.time())
+
+# ----------------------------------------------------------------------
+#  last_seen write coalescing
+# ----------------------------------------------------------------------
+# Every poll used to issue its own UPDATE (and fsync) just to bump
+# last_seen.  Buffer the newest value per client and flush them all in
+# one transaction periodically; last_seen may lag by up to the flush
+# interval, which is fine for a presence timestamp.
+
+LAST_SEEN_FLUSH_SECONDS = float(os.environ.get("BMSG_LAST_SEEN_FLUSH", "30"))
+
+_LAST_SEEN: dict = {}
+_LAST_SEEN_LOCK = threading.Lock()
+
+def _touch(client_id: str) -> None:
+    with _LAST_SEEN_LOCK:
+        _LAST_SEEN[client_id] = now_ts()
+
+def _flush_last_seen() -> None:
+    with _LAST_SEEN_LOCK:
+        pending = list(_LAST_SEEN.items())
+        _LAST_SEEN.clear()
+    if pending:
+        c = get_db()
+        c.executemany(SQL_TOUCH, [(ts, cid) for cid, ts in pending])
+        c.commit()
+        _bump_version()  # client ordering on / follows last_seen
+
+def _last_seen_flusher() -> None:
+    while True:
+        time.sleep(LAST_SEEN_FLUSH_SECONDS)
+        try:
+            _flush_last_seen()
+        except Exception:
+            pass  # keep the flusher alive; retry next tick
+
+threading.Thread(target=_last_seen_flusher, daemon=True).start()
+
+# ----------------------------------------------------------------------
+#  ack write batching
+# ----------------------------------------------------------------------
+# When many clients ack the same broadcast in a burst, each INSERT used
+# to pay its own commit/fsync.  A single writer thread drains the queue
+# and commits acks in batches; with one writer this also plays nicely
+# with WAL.
+
+ACK_FLUSH_SECONDS = float(os.environ.get("BMSG_ACK_FLUSH", "0.1"))
+ACK_FLUSH_ROWS    = 200
+
+_ACK_QUEUE: queue.Queue = queue.Queue()
+
+def _ack_writer() -> None:
+    while True:
+        batch = [_ACK_QUEUE.get()]
+        deadline = time.monotonic() + ACK_FLUSH_SECONDS
+        while len(batch) < ACK_FLUSH_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_ACK_QUEUE.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            c = get_db()
+            c.executemany(SQL_ACK_INSERT, batch)
+            # advance the persisted delivery cursors in the same commit
+            c.executemany(SQL_ACK_CURSOR,
+                          [(mid, cid) for cid, mid, _ in batch])
+            c.commit()
+        except Exception:
+            pass  # keep the writer alive; dropped acks surface as redelivery
+
+threading.Thread(target=_ack_writer, daemon=True).start()
+
+# ----------------------------------------------------------------------
+#  register write batching
+# ----------------------------------------------------------------------
+# A fleet restarting together (deploys, morning logins) storms /register;
+# same recipe as the ack writer — one thread, one transaction per burst.
+
+REG_FLUSH_SECONDS = float(os.environ.get("BMSG_REG_FLUSH", "0.02"))
+REG_FLUSH_ROWS    = 200
+
+_REG_QUEUE: queue.Queue = queue.Queue()
+
+def _register_writer() -> None:
+    while True:
+        batch = [_REG_QUEUE.get()]
+        deadline = time.monotonic() + REG_FLUSH_SECONDS
+        while len(batch) < REG_FLUSH_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_REG_QUEUE.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            c = get_db()
+            c.executemany(SQL_REGISTER, batch)
+            c.commit()
+            _bump_version()
+        except Exception:
+            pass  # keep the writer alive; clients re-register next start
+
+threading.Thread(target=_register_writer, daemon=True).start()
+
 with db() as c:
+    # must be set before the first table is created to take effect on a
+    # fresh DB; existing DBs keep their mode until the next full VACUUM
+    # (the /admin/vacuum endpoint), which applies the pending change
+    if _DB_ON_DISK:
+        c.execute("PRAGMA auto_vacuum=INCREMENTAL")
     c.executescript(SCHEMA)
 
+    # one-time database-level tuning: WAL lets concurrent /poll readers
+    # proceed while /ack and /admin/send append, and NORMAL sync halves
+    # the fsync traffic of small write transactions.
+    if _DB_ON_DISK:
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        # checkpoint in bulk (~4 MB of WAL) instead of per-transaction
+        c.execute("PRAGMA wal_autocheckpoint=1000")
+    c.execute("PRAGMA temp_store=MEMORY")
+    c.execute("PRAGMA mmap_size=268435456")
+
     # ---------- lightweight migrations ----------
-    def _ensure(column: str, ddl: str) -> None:
-        cols = {row["name"] for row in c.execute("PRAGMA table_info(clients)")}
-        if column not in cols:
-            c.execute(f"ALTER TABLE clients ADD COLUMN {ddl}")
+    # read the schema once and diff, instead of re-running the PRAGMA
+    # per column checked
+    _cols = {row["name"] for row in c.execute("PRAGMA table_info(clients)")}
+    for _col, _ddl in (
+            ("alias",   "alias TEXT"),
+            ("blocked", "blocked INTEGER NOT NULL DEFAULT 0"),
+            ("last_delivered_id", "last_delivered_id INTEGER NOT NULL DEFAULT 0")):
+        if _col not in _cols:
+            c.execute(f"ALTER TABLE clients ADD COLUMN {_ddl}")
+
+    # convert legacy ISO-8601 TEXT timestamps to unix epochs.  Old DBs
+    # declared these columns TEXT, so the stored values keep text
+    # affinity — match on the ISO date dash (epoch digits have none) to
+    # stay idempotent, and COALESCE guards against unparsable values.
+    for _tbl, _cols in (("clients",  ("last_seen", "created_at")),
+                        ("messages", ("created_at",)),
+                        ("reads",    ("read_at",))):
+        for _col in _cols:
+            c.execute(
+                f"UPDATE {_tbl} SET {_col}="
+                f"COALESCE(CAST(strftime('%s',{_col}) AS INTEGER), {_col}) "
+                f"WHERE typeof({_col})='text' AND instr({_col},'-')>0"
+            )
 
-    _ensure("alias",   "alias TEXT")
-    _ensure("blocked", "blocked INTEGER NOT NULL DEFAULT 0")
+    # backfill message_targets from the legacy JSON blobs of existing DBs
+    c.execute(
+        "INSERT OR IGNORE INTO message_targets(message_id, client_id) "
+        "SELECT m.id, j.value FROM messages m, json_each(m.targets) j "
+        "WHERE m.broadcast=0 AND m.targets IS NOT NULL"
+    )
     c.commit()
 
+    # refresh sqlite_stat1 so the planner costs the poll indexes correctly
+    c.execute("ANALYZE")
+
+    _MAX_MSG_ID = c.execute("SELECT COALESCE(MAX(id),0) FROM messages").fetchone()[0]
+    _BLOCKED.update(
+        r[0] for r in c.execute("SELECT client_id FROM clients WHERE blocked=1"))
+
 # ----------------------------------------------------------------------
 #  HTML (small additions: alias + blocked forms & display tweaks)
 # ----------------------------------------------------------------------
@@ -78,12 +397,65 @@ HTML = """
   <head>
     <meta charset="utf-8">
     <title>Broadcast Console</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
+    <!-- inline just the Bootstrap subset the console uses instead of
+         pulling ~200 KB from jsdelivr on every cold open -->
     <style>
-      body { background:#f7f7fb; }
-      .card { box-shadow: 0 1px 3px rgba(0,0,0,.06); }
-      pre { white-space: pre-wrap; }
-      .badge-blocked{background:#dc3545;}
+      *,*::before,*::after { box-sizing:border-box; }
+      body { margin:0; background:#f7f7fb; color:#212529;
+             font-family:system-ui,-apple-system,"Segoe UI",Roboto,sans-serif;
+             font-size:1rem; line-height:1.5; }
+      h1 { font-size:2.5rem; font-weight:500; margin:0 0 .5rem; }
+      h5, .card-title { font-size:1.25rem; font-weight:500; margin:0 0 .5rem; }
+      pre { white-space:pre-wrap; font-size:.875em; margin:0; }
+      hr { border:0; border-top:1px solid rgba(0,0,0,.15); margin:1rem 0; }
+      .container { max-width:1140px; margin:0 auto; padding:0 .75rem; }
+      .py-4 { padding-top:1.5rem; padding-bottom:1.5rem; }
+      .my-4 { margin-top:1.5rem; margin-bottom:1.5rem; }
+      .mb-2 { margin-bottom:.5rem; } .mb-3 { margin-bottom:1rem; }
+      .p-2 { padding:.5rem; } .p-3 { padding:1rem; }
+      .row { display:flex; flex-wrap:wrap; margin:0 -.5rem; }
+      .row > * { padding:0 .5rem; width:100%; }
+      .g-2 > * { padding:.25rem; } .g-3 > * { padding:.5rem; }
+      .col-auto { width:auto; flex:0 0 auto; }
+      .col-1 { flex:0 0 8.333%; } .col-3 { flex:0 0 25%; }
+      .col-4 { flex:0 0 33.333%; } .col-5 { flex:0 0 41.667%; }
+      .col-6 { flex:0 0 50%; }
+      @media (min-width:992px) {
+        .col-lg-5 { flex:0 0 41.667%; width:41.667%; }
+        .col-lg-7 { flex:0 0 58.333%; width:58.333%; }
+      }
+      .card { background:#fff; border:1px solid rgba(0,0,0,.125);
+              border-radius:.375rem; box-shadow:0 1px 3px rgba(0,0,0,.06); }
+      .card-body { padding:1rem; }
+      .btn { display:inline-block; padding:.375rem .75rem; font-size:1rem;
+             border:1px solid transparent; border-radius:.375rem;
+             cursor:pointer; text-align:center; text-decoration:none; }
+      .btn-primary { background:#0d6efd; border-color:#0d6efd; color:#fff; }
+      .btn-danger  { background:#dc3545; border-color:#dc3545; color:#fff; }
+      .btn-success { background:#198754; border-color:#198754; color:#fff; }
+      .btn-link { background:none; border:none; color:#0d6efd; text-decoration:underline; }
+      .btn-outline-secondary { border-color:#6c757d; color:#6c757d; background:#fff; }
+      .btn-outline-danger    { border-color:#dc3545; color:#dc3545; background:#fff; }
+      .btn-outline-warning   { border-color:#ffc107; color:#997404; background:#fff; }
+      .form-label { display:inline-block; margin-bottom:.25rem; font-size:.9rem; }
+      .form-control { display:block; width:100%; padding:.375rem .75rem;
+                      font-size:1rem; border:1px solid #ced4da;
+                      border-radius:.375rem; background:#fff; }
+      textarea.form-control { resize:vertical; }
+      .form-check { padding-left:1.5em; }
+      .form-check-input { margin-left:-1.5em; }
+      .form-check-label { margin-left:.25em; }
+      .alert { padding:.75rem 1rem; border:1px solid transparent;
+               border-radius:.375rem; margin-bottom:1rem; }
+      .alert-info { background:#cff4fc; border-color:#b6effb; color:#055160; }
+      .border { border:1px solid #dee2e6; } .rounded { border-radius:.375rem; }
+      .bg-white { background:#fff; }
+      .text-muted { color:#6c757d; } .small { font-size:.875em; }
+      .w-100 { width:100%; }
+      .d-flex { display:flex; } .gap-1 { gap:.25rem; }
+      .align-items-end { align-items:flex-end; }
+      .opacity-50 { opacity:.5; }
+      .text-decoration-line-through { text-decoration:line-through; }
     </style>
   </head>
   <body>
@@ -96,6 +468,19 @@ HTML = """
         {% endif %}
       {% endwith %}
 
+      <form class="row g-2 mb-3" method="get" action="{{ url_for('home') }}">
+        <div class="col-auto">
+          <input class="form-control" name="q" value="{{ q }}" placeholder="filter hostname">
+        </div>
+        <div class="col-auto"><button class="btn btn-outline-secondary">Filter</button></div>
+        {% if page > 0 %}
+          <div class="col-auto"><a class="btn btn-link" href="{{ url_for('home', q=q or None, page=page-1) }}">&laquo; Prev</a></div>
+        {% endif %}
+        {% if has_more %}
+          <div class="col-auto"><a class="btn btn-link" href="{{ url_for('home', q=q or None, page=page+1) }}">Next &raquo;</a></div>
+        {% endif %}
+      </form>
+
       <div class="row g-3">
         <!-- ----------------------------------------------------- -->
         <!--            NEW MESSAGE FORM                          -->
@@ -169,6 +554,19 @@ HTML = """
 
               <hr>
 
+              <!-- Vacuum (reclaims space after clears/deletes) -->
+              <form class="row g-2 align-items-end" method="post" action="{{ url_for('vacuum') }}">
+                <div class="col-6">
+                  <label class="form-label">Admin Secret</label>
+                  <input class="form-control" name="secret" type="password">
+                </div>
+                <div class="col-6">
+                  <button class="btn btn-outline-secondary w-100">Vacuum DB</button>
+                </div>
+              </form>
+
+              <hr>
+
               <!-- Delete one message by ID -->
               <form class="row g-2 align-items-end" method="post" action="{{ url_for('delete_message') }}">
                 <div class="col-5">
@@ -249,7 +647,7 @@ HTML = """
               <h5 class="card-title">Recent Messages</h5>
               {% for m in recent %}
                 <div class="border rounded p-2 mb-2">
-                  <div class="small text-muted">#{{ m['id'] }} • {{ m['created_at'] }}</div>
+                  <div class="small text-muted">#{{ m['id'] }} • {{ m['created_at']|isodate }}</div>
                   <div>{{ m['msg'] }}</div>
                   {% if m['url'] %}<div class="small">URL: {{ m['url'] }}</div>{% endif %}
                   <div class="small">
@@ -267,34 +665,132 @@ HTML = """
 
       <hr class="my-4">
       <h5>Clients JSON</h5>
-      <pre class="bg-white p-3 border rounded" style="max-height:240px; overflow:auto;">{{ clients|tojson(indent=2) }}</pre>
+      <!-- fetched after load: keeps O(fleet) pretty-printing out of the
+           synchronous page render, and /clients answers 304 when unchanged -->
+      <pre id="cj" class="bg-white p-3 border rounded" style="max-height:240px; overflow:auto;">loading…</pre>
+      <script>
+        fetch('/clients')
+          .then(function (r) { return r.json(); })
+          .then(function (j) {
+            document.getElementById('cj').textContent = JSON.stringify(j, null, 2);
+          })
+          .catch(function () {
+            document.getElementById('cj').textContent = 'failed to load /clients';
+          });
+      </script>
     </div>
   </body>
 </html>
 """
 
+# register the page as a named template: Flask's template cache keeps
+# the compiled module, and render_template() replaces the hand-rolled
+# compiled-object plumbing.  auto_reload off = no stat/reload checks on
+# a template that only changes with the code.
+app.jinja_loader = ChoiceLoader([DictLoader({"home.html": HTML}),
+                                 app.jinja_loader])
+app.jinja_env.auto_reload = False
+
 # ----------------------------------------------------------------------
 #  Routes – Home / list
 # ----------------------------------------------------------------------
 
+# Rendered home page keyed by a cheap DB version stamp; most hits are
+# admin refreshes where nothing has changed.
+HOME_CACHE_SECONDS = 2.0
+CLIENTS_PAGE_SIZE  = 500
+_HOME_CACHE = {"etag": None, "html": None, "ts": 0.0}
+
 @app.route("/")
 def home():
-    with db() as c:
+    page = max(request.args.get("page", 0, type=int) or 0, 0)
+    q    = (request.args.get("q") or "").strip()
+
+    c = get_db()
+    # every write path bumps _DB_VERSION, so cache validation is a pure
+    # in-memory check — no version-stamp query per refresh.  q is user
+    # input and must not reach the header raw (quotes/newlines break
+    # ETag parsing), so it goes in as a digest.
+    etag = f"{_DB_VERSION}-{page}-{hashlib.sha1(q.encode()).hexdigest()[:8]}"
+
+    # pending flash messages make the page unique; skip the cache then
+    has_flash = "_flashes" in session
+    if not has_flash:
+        if request.if_none_match.contains(etag):
+            return "", 304
+        if (_HOME_CACHE["etag"] == etag
+                and time.monotonic() - _HOME_CACHE["ts"] < HOME_CACHE_SECONDS):
+            resp = app.make_response(_HOME_CACHE["html"])
+            resp.set_etag(etag)
+            return resp
+
+    # filter in SQL and fetch one page (+1 row to detect a next page) so
+    # the HTML stays bounded regardless of fleet size
+    # explicit column lists: the template only touches these, and
+    # SELECT * would copy every column (alias history, timestamps)
+    # out of the page cache into Row objects for nothing
+    if q:
         clients_rows = c.execute(
-            "SELECT * FROM clients ORDER BY last_seen DESC"
+            "SELECT client_id,hostname,platform,alias,blocked FROM clients "
+            "WHERE hostname LIKE ? ORDER BY last_seen DESC LIMIT ? OFFSET ?",
+            (f"%{q}%", CLIENTS_PAGE_SIZE + 1, page * CLIENTS_PAGE_SIZE)
         ).fetchall()
-        recent_rows  = c.execute(
-            "SELECT * FROM messages ORDER BY id DESC LIMIT 10"
+    else:
+        clients_rows = c.execute(
+            "SELECT client_id,hostname,platform,alias,blocked FROM clients "
+            "ORDER BY last_seen DESC LIMIT ? OFFSET ?",
+            (CLIENTS_PAGE_SIZE + 1, page * CLIENTS_PAGE_SIZE)
         ).fetchall()
-    clients = [dict(r) for r in clients_rows]
-    recent  = [dict(r) for r in recent_rows]
-    return render_template_string(HTML, clients=clients, recent=recent)
+    has_more = len(clients_rows) > CLIENTS_PAGE_SIZE
+    clients_rows = clients_rows[:CLIENTS_PAGE_SIZE]
+
+    recent_rows  = c.execute(
+        "SELECT id,created_at,msg,url,broadcast,targets FROM messages "
+        "ORDER BY id DESC LIMIT 10"
+    ).fetchall()
+    # sqlite3.Row supports the template's r['col'] subscripting directly,
+    # so no per-row dict copy is needed now that the JSON panel is
+    # lazy-loaded from /clients
+    html = render_template("home.html", clients=clients_rows,
+                           recent=recent_rows, q=q, page=page,
+                           has_more=has_more)
+
+    resp = app.make_response(html)
+    if has_flash:
+        # one-shot banner: no validator and no caching, or the browser
+        # would keep 304-revalidating the flash page under the shared
+        # ETag and re-show the banner on every refresh
+        resp.headers["Cache-Control"] = "no-store"
+    else:
+        _HOME_CACHE.update(etag=etag, html=html, ts=time.monotonic())
+        resp.set_etag(etag)
+    return resp
 
 @app.route("/clients")
 def clients_json():
-    with db() as c:
-        rows = c.execute("SELECT * FROM clients ORDER BY last_seen DESC").fetchall()
-    return jsonify([dict(r) for r in rows])
+    c = get_db()
+    # dashboards poll this endpoint, and a 304 skips the full scan +
+    # serialization when nothing changed.  _DB_VERSION moves on every
+    # write, including alias/block flips that a MAX(last_seen) stamp
+    # would miss on an idle fleet.
+    etag = str(_DB_VERSION)
+    if request.if_none_match.contains(etag):
+        return "", 304
+    # build the dicts straight from positional tuples and serialize via
+    # the orjson-backed helper: one allocation path instead of
+    # Row -> dict -> jsonify for every client on the roster
+    rows = c.execute(
+        "SELECT client_id,hostname,platform,alias,blocked,last_seen,"
+        "created_at,last_delivered_id FROM clients ORDER BY last_seen DESC"
+    ).fetchall()
+    resp = _json([
+        {"client_id": r[0], "hostname": r[1], "platform": r[2],
+         "alias": r[3], "blocked": r[4], "last_seen": r[5],
+         "created_at": r[6], "last_delivered_id": r[7]}
+        for r in rows
+    ])
+    resp.set_etag(etag)
+    return resp
 
 # ----------------------------------------------------------------------
 #  Admin – send & maintenance (unchanged)
@@ -308,46 +804,109 @@ def send():
     broadcast = 1 if request.form.get("broadcast") else 0
     targets   = request.form.getlist("targets")
 
-    if secret != ADMIN_SECRET:
+    if not _auth(secret):
         flash("Invalid admin secret"); return redirect(url_for('home'))
     if not msg:
         flash("Message required"); return redirect(url_for('home'))
     if not broadcast and not targets:
         flash("Select targets or enable broadcast"); return redirect(url_for('home'))
 
-    with db() as c:
-        c.execute(
-            "INSERT INTO messages(created_at,msg,url,broadcast,targets) VALUES(?,?,?,?,?)",
-            (datetime.utcnow().isoformat(), msg, url,
-             broadcast, None if broadcast else json.dumps(targets))
-        ); c.commit()
+    c = get_db()
+    # the JSON blob stays for the console display; polling goes through
+    # the indexed message_targets rows instead.  BEGIN IMMEDIATE grabs
+    # the write lock once so the message and its whole target fan-out
+    # commit as a single transaction (one fsync).
+    targets_json = None if broadcast else json.dumps(targets)
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        mid = c.execute(
+            "INSERT INTO messages(created_at,msg,url,broadcast,targets) "
+            "VALUES(?,?,?,?,?) RETURNING id",
+            (now_ts(), msg, url, broadcast, targets_json)
+        ).fetchone()[0]
+        if not broadcast:
+            # splat the fan-out in one statement: json_each explodes the
+            # already-built display blob inside SQLite instead of a Python
+            # executemany loop
+            c.execute(
+                "INSERT OR IGNORE INTO message_targets(message_id,client_id) "
+                "SELECT ?, value FROM json_each(?)", (mid, targets_json)
+            )
+        c.commit()
+    except Exception:
+        # the connection is thread-local and long-lived: an open failed
+        # transaction would poison every later request on this thread
+        c.rollback()
+        raise
+    _bump_version()
+    global _MAX_MSG_ID
+    with _SEEN_LOCK:
+        _MAX_MSG_ID = max(_MAX_MSG_ID, mid)
+    with _WAKE:
+        _WAKE.notify_all()
     flash("Message queued")
     return redirect(url_for('home'))
 
 @app.post("/admin/clear_messages")
 def clear_messages():
-    if (request.form.get("secret") or "") != ADMIN_SECRET:
+    if not _auth(request.form.get("secret")):
         flash("Invalid admin secret"); return redirect(url_for("home"))
-    with db() as c:
-        c.execute("DELETE FROM reads")
-        c.execute("DELETE FROM messages")
-        c.commit()
+    c = get_db()
+    # SQLite's TRUNCATE analogue: dropping and recreating the tables is
+    # O(1) page-freeing, versus row-by-row DELETE journaling on big
+    # histories.  SCHEMA is all IF NOT EXISTS, so it rebuilds just the
+    # dropped tables and their indexes.
+    c.executescript(
+        "DROP TABLE IF EXISTS reads;"
+        "DROP TABLE IF EXISTS message_targets;"
+        "DROP TABLE IF EXISTS messages;"
+        + SCHEMA
+    )
+    # dropping messages resets the id sequence, so the delivery cursors
+    # must restart too or clients would skip the new low ids
+    c.execute("UPDATE clients SET last_delivered_id=0")
+    c.commit()
+    # hand the freed pages back to the filesystem right away instead of
+    # letting the file stay at its high-water mark
+    c.execute("PRAGMA incremental_vacuum")
+    _bump_version()
+    global _MAX_MSG_ID
+    with _SEEN_LOCK:
+        _MAX_MSG_ID = 0
+        _CLIENT_SEEN.clear()
     flash("All messages and read history cleared")
     return redirect(url_for("home"))
 
+@app.post("/admin/vacuum")
+def vacuum():
+    if not _auth(request.form.get("secret")):
+        flash("Invalid admin secret"); return redirect(url_for("home"))
+    c = get_db()
+    # reclaim the free pages left behind by clear_messages /
+    # delete_message (worth calling after a bulk clear), then let
+    # PRAGMA optimize re-ANALYZE whatever the planner now needs.
+    # Connections are thread-local and live for the process, so this
+    # endpoint is the natural place to refresh stats.
+    c.execute("VACUUM")
+    c.execute("PRAGMA optimize")
+    flash("Database vacuumed")
+    return redirect(url_for("home"))
+
 @app.post("/admin/delete_message")
 def delete_message():
     secret = (request.form.get("secret") or "")
     mid    = (request.form.get("message_id") or "").strip()
-    if secret != ADMIN_SECRET:
+    if not _auth(secret):
         flash("Invalid admin secret"); return redirect(url_for("home"))
     if not mid.isdigit():
         flash("Valid message_id required"); return redirect(url_for("home"))
     mid_i = int(mid)
-    with db() as c:
-        c.execute("DELETE FROM reads    WHERE message_id=?", (mid_i,))
-        c.execute("DELETE FROM messages WHERE id=?",         (mid_i,))
-        c.commit()
+    c = get_db()
+    c.execute("DELETE FROM reads           WHERE message_id=?", (mid_i,))
+    c.execute("DELETE FROM message_targets WHERE message_id=?", (mid_i,))
+    c.execute("DELETE FROM messages        WHERE id=?",         (mid_i,))
+    c.commit()
+    _bump_version()
     flash(f"Message #{mid_i} deleted")
     return redirect(url_for("home"))
 
@@ -355,14 +914,17 @@ def delete_message():
 def remove_client():
     secret = (request.form.get("secret") or "")
     cid    = (request.form.get("client_id") or "").strip()
-    if secret != ADMIN_SECRET:
+    if not _auth(secret):
         flash("Invalid admin secret"); return redirect(url_for("home"))
     if not cid:
         flash("client_id required");   return redirect(url_for("home"))
-    with db() as c:
-        c.execute("DELETE FROM reads   WHERE client_id=?", (cid,))
-        c.execute("DELETE FROM clients WHERE client_id=?", (cid,))
-        c.commit()
+    c = get_db()
+    c.execute("DELETE FROM reads           WHERE client_id=?", (cid,))
+    c.execute("DELETE FROM message_targets WHERE client_id=?", (cid,))
+    c.execute("DELETE FROM clients         WHERE client_id=?", (cid,))
+    c.commit()
+    _bump_version()
+    _BLOCKED.discard(cid)
     flash(f"Client {cid} removed")
     return redirect(url_for("home"))
 
@@ -375,13 +937,14 @@ def set_alias():
     secret = (request.form.get("secret") or "")
     cid    = (request.form.get("client_id") or "").strip()
     alias  = (request.form.get("alias") or "").strip()
-    if secret != ADMIN_SECRET:
+    if not _auth(secret):
         flash("Invalid admin secret"); return redirect(url_for("home"))
     if not cid:
         flash("client_id required");   return redirect(url_for("home"))
-    with db() as c:
-        c.execute("UPDATE clients SET alias=? WHERE client_id=?", (alias or None, cid))
-        c.commit()
+    c = get_db()
+    c.execute("UPDATE clients SET alias=? WHERE client_id=?", (alias or None, cid))
+    c.commit()
+    _bump_version()
     flash("Alias updated")
     return redirect(url_for("home"))
 
@@ -394,14 +957,16 @@ def block_client():
     secret = (request.form.get("secret") or "")
     cid    = (request.form.get("client_id") or "").strip()
     action = (request.form.get("action") or "block")
-    if secret != ADMIN_SECRET:
+    if not _auth(secret):
         flash("Invalid admin secret"); return redirect(url_for("home"))
     if not cid:
         flash("client_id required");   return redirect(url_for("home"))
     new_val = 0 if action == "unblock" else 1
-    with db() as c:
-        c.execute("UPDATE clients SET blocked=? WHERE client_id=?", (new_val, cid))
-        c.commit()
+    c = get_db()
+    c.execute("UPDATE clients SET blocked=? WHERE client_id=?", (new_val, cid))
+    c.commit()
+    _bump_version()
+    (_BLOCKED.add if new_val else _BLOCKED.discard)(cid)
     flash(f"{'Un-blocked' if new_val == 0 else 'Blocked'} {cid}")
     return redirect(url_for("home"))
 
@@ -412,29 +977,32 @@ def block_client():
 @app.post("/api/admin/alias")
 def api_alias():
     data = request.get_json(silent=True) or {}
-    if data.get("secret") != ADMIN_SECRET:
+    if not _auth(data.get("secret")):
         return jsonify({"error": "forbidden"}), 403
     cid   = data.get("client_id")
     alias = data.get("alias")  # may be None/empty = clear
     if not cid:
         return jsonify({"error": "client_id required"}), 400
-    with db() as c:
-        c.execute("UPDATE clients SET alias=? WHERE client_id=?", (alias or None, cid))
-        c.commit()
+    c = get_db()
+    c.execute("UPDATE clients SET alias=? WHERE client_id=?", (alias or None, cid))
+    c.commit()
+    _bump_version()
     return jsonify({"status": "ok", "client_id": cid, "alias": alias})
 
 @app.post("/api/admin/block")
 def api_block():
     data = request.get_json(silent=True) or {}
-    if data.get("secret") != ADMIN_SECRET:
+    if not _auth(data.get("secret")):
         return jsonify({"error": "forbidden"}), 403
     cid   = data.get("client_id")
     block = data.get("block", True)
     if not cid or not isinstance(block, bool):
         return jsonify({"error": "client_id and block(bool) required"}), 400
-    with db() as c:
-        c.execute("UPDATE clients SET blocked=? WHERE client_id=?", (1 if block else 0, cid))
-        c.commit()
+    c = get_db()
+    c.execute("UPDATE clients SET blocked=? WHERE client_id=?", (1 if block else 0, cid))
+    c.commit()
+    _bump_version()
+    (_BLOCKED.add if block else _BLOCKED.discard)(cid)
     return jsonify({"status": "ok", "client_id": cid, "blocked": block})
 
 # ----------------------------------------------------------------------
@@ -451,101 +1019,153 @@ def register():
     if not client_id:
         return jsonify({"error": "client_id required"}), 400
 
-    now = datetime.utcnow().isoformat()
-    with db() as c:
-        c.execute(
-            "INSERT INTO clients(client_id,hostname,platform,alias,blocked,last_seen,created_at)"
-            " VALUES(?,?,?,?,?, ?,?) "
-            "ON CONFLICT(client_id) DO UPDATE SET "
-            "  hostname=excluded.hostname, "
-            "  platform=excluded.platform, "
-            "  last_seen=excluded.last_seen, "
-            "  alias   =COALESCE(excluded.alias, alias)",
-            (client_id, hostname, platform, alias, 0, now, now)
-        )
-        c.commit()
-    return jsonify({"status": "ok"})
+    now = now_ts()
+    # enqueue for the batched writer: a whole fleet restarting at once
+    # shares one transaction instead of one fsync per client.  The row
+    # may lag by up to the flush window, which /poll tolerates (an
+    # unknown client just gets the cursor-less slow path).
+    _REG_QUEUE.put((client_id, hostname, platform, alias, 0, now, now))
+    return jsonify({"status": "queued"})
+
+def _next_unread(c: sqlite3.Connection, client_id: str, after: int = 0):
+    # one indexed query instead of fetching 50 rows and probing `reads`
+    # per row in Python; targeted matching is a primary-key probe on
+    # message_targets rather than a JSON parse.  `after` is the client's
+    # persisted delivery cursor — acks advance in ascending id order, so
+    # the id>? bound turns the history filter into a B-tree seek.
+    return c.execute(SQL_NEXT_UNREAD, (after, client_id, client_id)).fetchone()
 
 @app.post("/poll")
 def poll():
-    data       : dict = request.get_json(silent=True) or {}
+    data       : dict = _json_body()
     client_id  : str  = data.get("client_id") or ""
     if not client_id:
-        return jsonify({}), 400
-
-    with db() as c:
-        # check block status & refresh last_seen
-        row = c.execute(
-            "SELECT blocked FROM clients WHERE client_id=?", (client_id,)
-        ).fetchone()
-        if row and row["blocked"]:
-            c.execute("UPDATE clients SET last_seen=? WHERE client_id=?",
-                      (datetime.utcnow().isoformat(), client_id))
-            c.commit()
-            return jsonify({"blocked": True})  # nothing else
+        return _json({}, 400)
 
-        c.execute("UPDATE clients SET last_seen=? WHERE client_id=?",
-                  (datetime.utcnow().isoformat(), client_id))
+    _touch(client_id)
 
-        rows = c.execute(
-            "SELECT * FROM messages ORDER BY id DESC LIMIT 50"
-        ).fetchall()
+    # pure in-memory fast path: the client has acked the newest message,
+    # so nothing unread can exist for it — park on the condition (so the
+    # long-poll contract holds) and answer {} without opening SQLite
+    with _WAKE:
+        if client_id not in _BLOCKED and _MAX_MSG_ID <= _CLIENT_SEEN.get(client_id, 0):
+            if LONG_POLL_SECONDS > 0:
+                _WAKE.wait(LONG_POLL_SECONDS)
+            if _MAX_MSG_ID <= _CLIENT_SEEN.get(client_id, 0):
+                return _json({})
 
-        for r in rows:
-            r = dict(r)
-            # broadcast
-            if r["broadcast"]:
-                read = c.execute(
-                    "SELECT 1 FROM reads WHERE client_id=? AND message_id=?",
-                    (client_id, r["id"])
-                ).fetchone()
-                if not read:
-                    return jsonify({"id": r["id"], "msg": r["msg"], "url": r["url"] or ""})
-            # targeted
-            else:
-                targets: _t.List[str]
-                try:
-                    targets = json.loads(r["targets"] or "[]")
-                except Exception:
-                    targets = []
-                if client_id in targets:
-                    read = c.execute(
-                        "SELECT 1 FROM reads WHERE client_id=? AND message_id=?",
-                        (client_id, r["id"])
-                    ).fetchone()
-                    if not read:
-                        return jsonify({"id": r["id"], "msg": r["msg"], "url": r["url"] or ""})
-    return jsonify({})
+    c = get_db()
+    # one row fetch covers both the block check and the delivery cursor
+    state = c.execute(SQL_POLL_CLIENT, (client_id,)).fetchone()
+    if state and state["blocked"]:
+        return _json({"blocked": True})  # nothing else
+    after = state["last_delivered_id"] if state else 0
+
+    # long-poll: hold the request open until /admin/send signals a new
+    # message (or the timeout passes), instead of making clients busy-poll.
+    # Querying under the condition lock closes the race between the first
+    # lookup and the wait.
+    with _WAKE:
+        row = _next_unread(c, client_id, after)
+        if row is None and LONG_POLL_SECONDS > 0:
+            _WAKE.wait(LONG_POLL_SECONDS)
+            row = _next_unread(c, client_id, after)
+    if row:
+        return _json({"id": row[0], "msg": row[1], "url": row[2] or ""})
+    return _json({})
 
 @app.post("/ack")
 def ack():
-    data       : dict = request.get_json(silent=True) or {}
-    client_id  : str  = data.get("client_id")
-    message_id : int  = data.get("message_id")
-    if not client_id or not message_id:
-        return jsonify({"error": "client_id and message_id required"}), 400
-    with db() as c:
-        c.execute(
-            "INSERT OR IGNORE INTO reads(client_id,message_id,read_at) "
-            "VALUES(?,?,?)",
-            (client_id, message_id, datetime.utcnow().isoformat())
-        )
+    data      : dict = _json_body()
+    client_id : str  = data.get("client_id")
+    # single message_id or a message_ids list: clients that batch acks
+    # get the whole burst into one writer-thread commit
+    ids = data.get("message_ids")
+    if ids is None:
+        ids = [data.get("message_id")]
+    if (not client_id or not isinstance(ids, list) or not ids
+            or not all(isinstance(m, int) and m > 0 for m in ids)):
+        return _json({"error": "client_id and message_id(s) required"}, 400)
+    ts = now_ts()
+    for mid in ids:
+        _ACK_QUEUE.put((client_id, mid, ts))
+    # advance the in-memory cursor /poll short-circuits on; acks arrive
+    # in ascending id order per client, so a plain max is enough
+    newest = max(ids)
+    with _SEEN_LOCK:
+        if newest > _CLIENT_SEEN.get(client_id, 0):
+            _CLIENT_SEEN[client_id] = newest
+        _CLIENT_SEEN.move_to_end(client_id)
+        if len(_CLIENT_SEEN) > _CLIENT_SEEN_MAX:
+            _CLIENT_SEEN.popitem(last=False)
+    return _json({"status": "queued", "count": len(ids)})
+
+@app.post("/ack_bulk")
+def ack_bulk():
+    # synchronous sibling of /ack: one BEGIN IMMEDIATE transaction for
+    # the whole list, durable by the time the response is sent — for
+    # clients that want confirmation rather than the queued fast path
+    data      : dict = _json_body()
+    client_id : str  = data.get("client_id")
+    ids = data.get("message_ids")
+    if (not client_id or not isinstance(ids, list) or not ids
+            or not all(isinstance(m, int) and m > 0 for m in ids)):
+        return _json({"error": "client_id and message_ids required"}, 400)
+    ts = now_ts()
+    c = get_db()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        c.executemany(SQL_ACK_INSERT, [(client_id, mid, ts) for mid in ids])
+        c.execute(SQL_ACK_CURSOR, (max(ids), client_id))
         c.commit()
-    return jsonify({"status": "ok"})
+    except Exception:
+        # same reasoning as send(): never leave a failed transaction
+        # open on the thread-local connection
+        c.rollback()
+        raise
+    with _SEEN_LOCK:
+        if max(ids) > _CLIENT_SEEN.get(client_id, 0):
+            _CLIENT_SEEN[client_id] = max(ids)
+        _CLIENT_SEEN.move_to_end(client_id)
+        if len(_CLIENT_SEEN) > _CLIENT_SEEN_MAX:
+            _CLIENT_SEEN.popitem(last=False)
+    return _json({"status": "ok", "count": len(ids)})
 
 # ----------------------------------------------------------------------
 #  Main
 # ----------------------------------------------------------------------
 
+def serve(host: str, port: int) -> None:
+    """Run under waitress when installed; the single-threaded Flask dev
+    server would serialize every request and defeat both WAL concurrency
+    and long-polling.  For gunicorn use:
+    gunicorn -k gthread --threads 16 --workers 1 server:app
+    (exactly one worker — delivery state lives in process memory; see
+    the README)
+    """
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        print("waitress not installed — falling back to the Flask dev server")
+        app.run(host=host, port=port)
+        return
+    # plenty of threads: each long-polling client parks one for up to 25 s
+    waitress_serve(app, host=host, port=port, threads=32)
+
 if __name__ == "__main__":
     import argparse, sys
     parser = argparse.ArgumentParser()
     parser.add_argument("--host",   default="0.0.0.0")
     parser.add_argument("--port",   type=int, default=5000)
     parser.add_argument("--secret", help="Admin secret (overrides env)")
+    parser.add_argument("--debug",  action="store_true",
+                        help="Werkzeug debugger/reloader (development only)")
     args = parser.parse_args()
 
     if args.secret:
         ADMIN_SECRET = args.secret
 
-    app.run(host=args.host, port=args.port, debug=True)
+    if args.debug:
+        app.run(host=args.host, port=args.port, debug=True)
+    else:
+        serve(args.host, args.port)